@@ -1,41 +1,81 @@
 #!/usr/bin/env -S uv run --script
 # /// script
 # requires-python = ">=3.10"
-# dependencies = ["typer", "rich"]
+# dependencies = ["typer", "rich", "orjson"]
 # ///
 """
 ai-blame: Show AI conversation context for git commits.
 """
 
 import bisect
+import calendar
+import heapq
 import json
+import mmap
+import multiprocessing
 import os
+import pickle
 import re
+import shutil
 import subprocess
+import tempfile
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+from contextlib import nullcontext
 from dataclasses import dataclass, field
-from datetime import datetime
+from datetime import datetime, timedelta, timezone
+from functools import lru_cache
+from itertools import repeat
+from operator import itemgetter
 from pathlib import Path
-from typing import Optional
+from typing import Iterator, Optional
 
 import typer
-from rich import box
 from rich.console import Console
-from rich.table import Table
-from rich.text import Text
+from rich.text import Text  # loaded by rich.console anyway; Table/box are imported where used
+
+try:
+    import orjson
+except ImportError:  # declared in the script deps; stdlib json when run outside uv
+    orjson = None
+
+try:
+    import re2 as re_fast
+except ImportError:  # optional linear-time matcher, falls back to stdlib re
+    re_fast = re
+
+
+def _loads(data: bytes):
+    """Decode JSON, with orjson when available.
+
+    JSON.stringify writes lone surrogate escapes (a string cut mid-emoji), which
+    orjson rejects but stdlib json accepts. Such data falls back to json and the
+    unpaired surrogates become "?", so the strings can still be printed.
+    """
+    if orjson is None:
+        return json.loads(data)
+    try:
+        return orjson.loads(data)
+    except ValueError:
+        decoded = json.loads(data)  # still raises for data that isn't JSON at all
+        return orjson.loads(json.dumps(decoded, ensure_ascii=False).encode("utf-8", "replace"))
 
 
 # --- Data Model ---
 
 
-@dataclass
+@dataclass(slots=True, eq=False)
 class Interaction:
-    """A user prompt with its context from session logs."""
+    """A user prompt with its context from session logs.
+
+    Built once the whole session file has been read, so containers are immutable.
+    """
 
     timestamp: float  # Unix epoch
     session_id: str
     prompt: str  # User message content
-    explicit_hashes: list[str] = field(default_factory=list)  # From tool_result
-    files_edited: set[str] = field(default_factory=set)  # From Edit/Write calls
+    explicit_hashes: tuple[str, ...] = ()  # From tool_result
+    files_edited: frozenset[str] = frozenset()  # From Edit/Write calls
 
 
 @dataclass
@@ -44,153 +84,390 @@ class BlameIndex:
 
     hash_map: dict[str, Interaction] = field(default_factory=dict)  # short_hash → Interaction
     timeline: list[tuple[float, Interaction]] = field(default_factory=list)  # sorted by timestamp
-    timeline_keys: list[float] = field(default_factory=list)  # for bisect
 
 
 # Regex to extract commit hash from git commit output: [branch hash]
-COMMIT_HASH_PATTERN = re.compile(r"\[[\w\-/]+ ([0-9a-f]{7,})\]")
+COMMIT_HASH_PATTERN = re_fast.compile(r"\[[\w\-/]+ ([0-9a-f]{7,})\]")
+
+# Raw-line markers checked before JSON decoding; other entry types are never read
+_USER_MARKER = b'"type":"user"'
+_ASSISTANT_MARKER = b'"type":"assistant"'
+_TOOL_USE_RESULT_MARKER = b'"toolUseResult"'
+_TOOL_RESULT_MARKER = b'"tool_result"'
+_PROGRESS_MARKER = b'"type":"progress"'  # wraps sub-agent messages, incl. assistant ones
+
+# Assistant lines above this size (typically a big Write payload) are not decoded;
+# the Edit/Write file paths are pulled out of the raw line instead
+LARGE_LINE_BYTES = 64 * 1024
+_TOOL_EDIT_NAMES = frozenset(("Edit", "Write"))
+EDIT_PATH_PATTERN = re_fast.compile(rb'"name":"(?:Edit|Write)"[^}]*?"file_path":"((?:[^"\\]|\\.)*)"')
+
+
+def scan_session_entries(project_path: Path) -> list[os.DirEntry]:
+    """List session JSONL entries in a project directory, oldest first."""
+    try:
+        # DirEntry.stat() is cached per entry, so sorting and callers share one stat
+        with os.scandir(project_path) as it:
+            entries = [e for e in it if e.name.endswith(".jsonl") and not e.name.startswith("agent-")]
+    except OSError:
+        return []
+
+    entries.sort(key=lambda e: e.stat().st_mtime)
+    return entries
 
 
 def find_all_session_files(project_dir: Optional[str] = None) -> list[Path]:
     """Find all session JSONL files for the project."""
-    claude_dir = Path.home() / ".claude" / "projects"
+    claude_dir = get_claude_dir()
 
     if project_dir is None:
         project_dir = get_project_dir()
 
-    project_path = claude_dir / project_dir
-    if not project_path.exists():
-        return []
+    return [Path(e.path) for e in scan_session_entries(claude_dir / project_dir)]
 
-    return sorted(
-        [f for f in project_path.glob("*.jsonl") if not f.stem.startswith("agent-")],
-        key=lambda f: f.stat().st_mtime,
-    )
 
+def find_commit_hashes(text: str) -> list[str]:
+    """Find commit hashes in git output; skips the scan when no bracket is present."""
+    if "[" not in text:
+        return []
+    return COMMIT_HASH_PATTERN.findall(text)
 
-def extract_hashes_from_entry(entry: dict) -> list[str]:
-    """Extract commit hashes from a session entry (tool_result after git commit)."""
-    hashes = []
 
-    # Check toolUseResult.stdout
-    tool_result = entry.get("toolUseResult", {})
+def extract_tool_output_hashes(tool_result) -> list[str]:
+    """Extract commit hashes from an entry's toolUseResult (stdout after git commit)."""
     if isinstance(tool_result, dict):
         stdout = tool_result.get("stdout", "")
         if stdout and isinstance(stdout, str):
-            for match in COMMIT_HASH_PATTERN.finditer(stdout):
-                hashes.append(match.group(1))
+            return find_commit_hashes(stdout)
     elif isinstance(tool_result, str):
-        for match in COMMIT_HASH_PATTERN.finditer(tool_result):
-            hashes.append(match.group(1))
+        return find_commit_hashes(tool_result)
+    return []
 
-    # Also check message.content for tool_result blocks
-    message = entry.get("message", {})
-    content = message.get("content", [])
-    if isinstance(content, list):
-        for item in content:
-            if isinstance(item, dict) and item.get("type") == "tool_result":
-                result_content = item.get("content", "")
-                if isinstance(result_content, str):
-                    for match in COMMIT_HASH_PATTERN.finditer(result_content):
-                        hashes.append(match.group(1))
 
-    return hashes
+# Text blocks starting with these are system markers, not typed by the user.
+# Prompts in the index also drop "<...>" blocks; the conversation view keeps them.
+PROMPT_SKIP_MARKERS = ("#", "<")
+CONVERSATION_SKIP_MARKERS = ("#",)
 
 
-def extract_prompt_text(entry: dict) -> Optional[str]:
-    """Extract user prompt text from a session entry."""
-    message = entry.get("message", {})
+def extract_user_text(message: dict, skip_markers: tuple[str, ...]) -> Optional[str]:
+    """Extract readable text from a user message, skipping marker blocks."""
     content = message.get("content", "")
 
     if isinstance(content, str):
         if content.startswith("<command-message>"):
             return None
-        return content.strip() if content.strip() else None
+        return content.strip() or None
 
     if isinstance(content, list):
         texts = []
         for item in content:
             if isinstance(item, dict) and item.get("type") == "text":
                 text = item.get("text", "")
-                # Skip system markers
-                if not text.startswith("#") and not text.startswith("<"):
+                if not text.startswith(skip_markers):
                     texts.append(text)
         return "\n".join(texts).strip() if texts else None
 
     return None
 
 
-def build_index(session_files: list[Path]) -> BlameIndex:
-    """Join all sessions, build lookup structures."""
-    hash_map: dict[str, Interaction] = {}
-    timeline: list[tuple[float, Interaction]] = []
-
-    current_interaction: Optional[Interaction] = None
-
-    for session_file in session_files:
-        session_id = session_file.stem
+def iter_marked_lines(session_file: Path, markers: tuple[bytes, ...]) -> Iterator[bytes]:
+    """Yield the lines of a file that contain any of the markers.
 
+    The file is memory-mapped and searched for the markers directly, so lines
+    without one are never copied into Python objects.
+    """
+    with open(session_file, "rb") as f:
+        try:
+            mm = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+        except ValueError:  # empty file
+            return
+    with mm:
+        size = len(mm)
+        next_hits = {marker: mm.find(marker) for marker in markers}
+        pos = 0
+        while True:
+            hits = [hit for hit in next_hits.values() if hit >= 0]
+            if not hits:
+                return
+            hit = min(hits)
+            newline = mm.rfind(b"\n", pos, hit)
+            line_start = newline + 1 if newline >= 0 else pos
+            line_end = mm.find(b"\n", hit)
+            if line_end < 0:
+                line_end = size
+            yield mm[line_start:line_end]
+
+            # Advance every marker whose next hit was on the line just yielded
+            pos = line_end + 1
+            for marker, marker_hit in next_hits.items():
+                if 0 <= marker_hit < pos:
+                    next_hits[marker] = mm.find(marker, pos)
+
+
+def iso_to_epoch(ts: str) -> Optional[float]:
+    """Convert an ISO timestamp to Unix epoch, or None if it can't be parsed.
+
+    Session logs use UTC "YYYY-MM-DDTHH:MM:SS.fffZ", which is sliced directly;
+    anything else goes through parse_timestamp().
+    """
+    if not isinstance(ts, str):
+        return None
+    if len(ts) >= 20 and ts[-1] == "Z" and ts[10] == "T" and ts[19] in ".Z":
         try:
-            with open(session_file, "r") as f:
-                for line in f:
+            seconds = calendar.timegm((
+                int(ts[0:4]), int(ts[5:7]), int(ts[8:10]),
+                int(ts[11:13]), int(ts[14:16]), int(ts[17:19]),
+            ))
+            return seconds + (float(ts[19:-1]) if ts[19] == "." else 0.0)
+        except ValueError:
+            pass
+    dt = parse_timestamp(ts)
+    return dt.timestamp() if dt else None
+
+
+def strip_root(file_path: str, root_prefix: str) -> str:
+    """Make a path under root_prefix (a directory ending in os.sep) relative to it.
+
+    Tool inputs carry absolute paths, so a prefix check replaces os.path.relpath;
+    paths outside the root are kept as they are and never match git's paths.
+    """
+    return file_path[len(root_prefix):] if file_path.startswith(root_prefix) else file_path
+
+
+def epoch_to_log_timestamp(ts: float) -> str:
+    """Format a Unix epoch like session log timestamps, truncated to milliseconds.
+
+    Strings in that fixed-width UTC form order the same as the times they encode.
+    Log timestamps have millisecond precision, so for a log timestamp e and any
+    t, e <= t exactly when e <= t truncated to milliseconds: comparing against
+    this string gives the same answer as comparing epochs.
+    """
+    return datetime.fromtimestamp(ts, timezone.utc).strftime("%Y-%m-%dT%H:%M:%S.%f")[:-3] + "Z"
+
+
+def add_edited_file(files_edited: set[str], file_path: str, root_prefix: str) -> None:
+    """Record an Edit/Write target, relative to the repo root like git's numstat paths."""
+    if file_path:
+        files_edited.add(strip_root(file_path, root_prefix))
+
+
+def parse_interactions(session_file: Path, repo_root: str) -> list[Interaction]:
+    """Parse one session file into interactions, in file order.
+
+    Edited paths are stored relative to repo_root, matching git's numstat paths.
+    """
+    session_id = session_file.stem
+    root_prefix = os.path.join(repo_root, "")
+    # (timestamp, prompt, hashes, files) per prompt; the current prompt's
+    # hashes and files are filled in until the next prompt starts
+    prompts: list[tuple[float, str, list[str], set[str]]] = []
+    hashes: Optional[list[str]] = None
+    files: Optional[set[str]] = None
+
+    for line in iter_marked_lines(session_file, (_USER_MARKER, _ASSISTANT_MARKER)):
+        # Not a user line, so this is a large assistant entry
+        if (
+            len(line) > LARGE_LINE_BYTES
+            and _USER_MARKER not in line
+            and _PROGRESS_MARKER not in line
+        ):
+            if files is not None:
+                for raw_path in EDIT_PATH_PATTERN.findall(line):
                     try:
-                        entry = json.loads(line)
-                    except json.JSONDecodeError:
+                        file_path = _loads(b'"' + raw_path + b'"')
+                    except ValueError:  # e.g. invalid UTF-8 in the raw bytes
                         continue
+                    add_edited_file(files, file_path, root_prefix)
+            continue
 
-                    entry_type = entry.get("type")
-                    user_type = entry.get("userType")
-                    timestamp_str = entry.get("timestamp", "")
+        try:
+            entry = _loads(line)
+        except ValueError:
+            continue
 
-                    # Parse timestamp
-                    try:
-                        ts = datetime.fromisoformat(timestamp_str.replace("Z", "+00:00"))
-                        timestamp = ts.timestamp()
-                    except (ValueError, AttributeError):
-                        continue
+        entry_type = entry.get("type")
+        user_type = entry.get("userType")
 
-                    # User prompt starts a new interaction
-                    if entry_type == "user" and user_type == "external":
-                        prompt_text = extract_prompt_text(entry)
-                        if prompt_text:
-                            current_interaction = Interaction(
-                                timestamp=timestamp,
-                                session_id=session_id,
-                                prompt=prompt_text,
-                                explicit_hashes=[],
-                                files_edited=set(),
-                            )
-                            timeline.append((timestamp, current_interaction))
-
-                    # Assistant response - extract file paths and commit hashes
-                    elif entry_type == "assistant" and current_interaction:
-                        # Extract file paths from Edit/Write
-                        message = entry.get("message", {})
-                        content = message.get("content", [])
-                        if isinstance(content, list):
-                            for item in content:
-                                if isinstance(item, dict) and item.get("type") == "tool_use":
-                                    tool_name = item.get("name", "")
-                                    if tool_name in ("Edit", "Write"):
-                                        file_path = item.get("input", {}).get("file_path", "")
-                                        if file_path:
-                                            current_interaction.files_edited.add(file_path)
-
-                    # Tool result - extract commit hashes
-                    hashes = extract_hashes_from_entry(entry)
-                    if hashes and current_interaction:
-                        for h in hashes:
-                            current_interaction.explicit_hashes.append(h)
-                            hash_map[h] = current_interaction
+        # User prompt starts a new interaction; only prompts need a timestamp
+        if entry_type == "user" and user_type == "external":
+            prompt_text = extract_user_text(entry.get("message", {}), PROMPT_SKIP_MARKERS)
+            timestamp = iso_to_epoch(entry.get("timestamp", "")) if prompt_text else None
+            if timestamp is not None:
+                hashes, files = [], set()
+                prompts.append((timestamp, prompt_text, hashes, files))
 
-        except (IOError, OSError):
+        if hashes is None or files is None:
+            continue
+
+        # Only user entries carry tool results (and with them, commit hashes)
+        is_tool_result = entry_type == "user" and (
+            _TOOL_USE_RESULT_MARKER in line or _TOOL_RESULT_MARKER in line
+        )
+        if is_tool_result:
+            hashes.extend(extract_tool_output_hashes(entry.get("toolUseResult")))
+        elif entry_type != "assistant":
+            continue
+
+        # Single pass over content: Edit/Write paths and tool_result hashes
+        message = entry.get("message", {})
+        content = message.get("content", [])
+        if not isinstance(content, list):
+            continue
+        for item in content:
+            if not isinstance(item, dict):
+                continue
+            item_type = item.get("type")
+            if item_type == "tool_use" and entry_type == "assistant":
+                if item.get("name") in _TOOL_EDIT_NAMES:
+                    file_path = item.get("input", {}).get("file_path", "")
+                    add_edited_file(files, file_path, root_prefix)
+            elif item_type == "tool_result" and is_tool_result:
+                result_content = item.get("content", "")
+                if isinstance(result_content, str):
+                    hashes.extend(find_commit_hashes(result_content))
+
+    return [
+        Interaction(timestamp, session_id, prompt_text, tuple(hashes), frozenset(files))
+        for timestamp, prompt_text, hashes, files in prompts
+    ]
+
+
+# Below this many files a process pool costs more to start than it saves
+PARALLEL_MIN_FILES = 4
+
+
+def _parse_session_rows(session_file: Path, repo_root: str) -> Optional[list[tuple]]:
+    """Parse one file into plain tuples, which pickle across processes without
+    referencing this script's module; None if the file can't be read."""
+    try:
+        interactions = parse_interactions(session_file, repo_root)
+    except (IOError, OSError):
+        return None
+    return [
+        (i.timestamp, i.session_id, i.prompt, i.explicit_hashes, i.files_edited)
+        for i in interactions
+    ]
+
+
+def parse_session_files(session_files: list[Path], repo_root: str) -> list[Optional[list[Interaction]]]:
+    """Parse session files, in parallel when there are enough of them."""
+    rows_per_file: list[Optional[list[tuple]]] = []
+    if len(session_files) >= PARALLEL_MIN_FILES:
+        try:
+            workers = min(len(session_files), os.cpu_count() or 1)
+            with ProcessPoolExecutor(max_workers=workers) as executor:
+                rows_per_file = list(executor.map(_parse_session_rows, session_files, repeat(repo_root)))
+        except (OSError, BrokenProcessPool):
+            rows_per_file = []  # no usable process pool here; parse serially
+    if not rows_per_file:
+        rows_per_file = [_parse_session_rows(f, repo_root) for f in session_files]
+
+    return [
+        [Interaction(*row) for row in rows] if rows is not None else None
+        for rows in rows_per_file
+    ]
+
+
+# Per-project cache of parsed session files, stored next to the sessions
+CACHE_FILE_NAME = ".ai-blame-cache.pkl"
+CACHE_VERSION = 3
+
+# Cache layout: {str(path): (st_mtime_ns, st_size, interactions)}
+SessionCache = dict[str, tuple[int, int, list[Interaction]]]
+
+
+def load_cached_index(cache_file: Path, repo_root: str) -> SessionCache:
+    """Load per-file parse results, or an empty cache if missing or stale."""
+    try:
+        with open(cache_file, "rb") as f:
+            cache = pickle.load(f)
+    except (OSError, EOFError, pickle.UnpicklingError, AttributeError, ImportError, TypeError, ValueError):
+        return {}
+    if not isinstance(cache, dict) or cache.get("version") != CACHE_VERSION:
+        return {}
+    if cache.get("repo_root") != repo_root:  # edited paths are relative to it
+        return {}
+    return cache.get("files", {})
+
+
+def save_cached_index(cache_file: Path, files: SessionCache, repo_root: str) -> None:
+    """Write the cache atomically; failures only cost a re-parse next time."""
+    tmp_file = cache_file.with_name(f"{cache_file.name}.{os.getpid()}.tmp")
+    try:
+        with open(tmp_file, "wb") as f:
+            pickle.dump({"version": CACHE_VERSION, "repo_root": repo_root, "files": files}, f, protocol=pickle.HIGHEST_PROTOCOL)
+        os.replace(tmp_file, cache_file)
+    except (OSError, pickle.PicklingError):
+        try:
+            tmp_file.unlink()
+        except OSError:
+            pass
+
+
+def build_index(
+    session_files: list[Path], repo_root: Optional[str] = None, cached: Optional[SessionCache] = None
+) -> BlameIndex:
+    """Join all sessions, build lookup structures.
+
+    Files whose (mtime, size) match the on-disk cache are not re-parsed.
+    A cache the caller already loaded can be passed in as `cached`.
+    """
+    if repo_root is None:
+        repo_root = get_repo_root()
+    cache_file = session_files[0].parent / CACHE_FILE_NAME if session_files else None
+    if cached is None:
+        cached = load_cached_index(cache_file, repo_root) if cache_file else {}
+
+    # Reuse cached results where the file is unchanged, re-parse the rest
+    stats: dict[str, os.stat_result] = {}
+    changed: list[Path] = []
+    for session_file in session_files:
+        key = str(session_file)
+        try:
+            st = session_file.stat()
+        except OSError:
             continue
+        stats[key] = st
+        hit = cached.get(key)
+        if not (hit and hit[0] == st.st_mtime_ns and hit[1] == st.st_size):
+            changed.append(session_file)
+    parsed = dict(zip(map(str, changed), parse_session_files(changed, repo_root)))
+
+    files: SessionCache = {}
+    for key, st in stats.items():
+        interactions = parsed[key] if key in parsed else cached[key][2]
+        if interactions is not None:
+            files[key] = (st.st_mtime_ns, st.st_size, interactions)
+
+    # Keep cached sessions outside this call (e.g. a partial build) while they exist
+    requested = set(map(str, session_files))
+    to_save = {
+        key: entry for key, entry in cached.items()
+        if key not in requested and os.path.exists(key)
+    }
+    to_save.update(files)
+    if cache_file and (changed or to_save.keys() != cached.keys()):
+        save_cached_index(cache_file, to_save, repo_root)
+
+    # Merge per-file results; later files win on duplicate hashes
+    hash_map: dict[str, Interaction] = {}
+    runs: list[list[tuple[float, Interaction]]] = []
+    for _, _, interactions in files.values():
+        run = [(interaction.timestamp, interaction) for interaction in interactions]
+        run.sort(key=itemgetter(0))  # already in order within a session, so linear
+        runs.append(run)
+        for interaction in interactions:
+            for h in interaction.explicit_hashes:
+                hash_map[h] = interaction
+
+    timeline = list(heapq.merge(*runs, key=itemgetter(0)))
 
-    # Sort timeline and extract keys for bisect
-    timeline.sort(key=lambda x: x[0])
-    timeline_keys = [t for t, _ in timeline]
+    return BlameIndex(hash_map=hash_map, timeline=timeline)
 
-    return BlameIndex(hash_map=hash_map, timeline=timeline, timeline_keys=timeline_keys)
+
+# Longest gap between a prompt and the commit it produced
+MATCH_WINDOW_SECONDS = 300
 
 
 class BlameResolver:
@@ -220,10 +497,10 @@ class BlameResolver:
 
     def match_by_window(self, commit_hash: str, commit_timestamp: float) -> Optional[Interaction]:
         """O(log n) lookup - prompt immediately before commit."""
-        if not self.index.timeline_keys:
+        if not self.index.timeline:
             return None
 
-        idx = bisect.bisect_right(self.index.timeline_keys, commit_timestamp)
+        idx = bisect.bisect_right(self.index.timeline, commit_timestamp, key=itemgetter(0))
 
         if idx == 0:
             return None
@@ -232,215 +509,519 @@ class BlameResolver:
         delta = commit_timestamp - prompt_time
 
         # Prompt must be before commit, within 5 minutes
-        if 0 <= delta <= 300:
+        if 0 <= delta <= MATCH_WINDOW_SECONDS:
             return interaction
         return None
 
+    def match_many_by_window(self, commit_timestamps: list[float]) -> list[Optional[Interaction]]:
+        """O(n + m) batch of match_by_window - one merge-walk over the timeline."""
+        timeline = self.index.timeline
+        matches: list[Optional[Interaction]] = [None] * len(commit_timestamps)
+        idx = 0
+        for i in sorted(range(len(commit_timestamps)), key=commit_timestamps.__getitem__):
+            commit_timestamp = commit_timestamps[i]
+            while idx < len(timeline) and timeline[idx][0] <= commit_timestamp:
+                idx += 1
+            if idx > 0:
+                prompt_time, interaction = timeline[idx - 1]
+                if 0 <= commit_timestamp - prompt_time <= MATCH_WINDOW_SECONDS:
+                    matches[i] = interaction
+        return matches
+
+    def resolve_many(self, commits: list[tuple[str, float]]) -> list[tuple[Optional[Interaction], str]]:
+        """Resolve (hash, timestamp) pairs; same results as resolve() on each."""
+        window_matches = self.match_many_by_window([ts for _, ts in commits])
+        results: list[tuple[Optional[Interaction], str]] = []
+        for (commit_hash, commit_timestamp), window_match in zip(commits, window_matches):
+            # Same priority as self.strategies: hash first, then time window
+            interaction = self.match_by_hash(commit_hash, commit_timestamp)
+            if interaction:
+                results.append((interaction, "match_by_hash"))
+            elif window_match:
+                results.append((window_match, "match_by_window"))
+            else:
+                results.append((None, "none"))
+        return results
+
+
+# Only the head of a session is read to find when it started
+_HEAD_BYTES = 64 * 1024
+_TIMESTAMP_PATTERN = re.compile(rb'"timestamp":"([^"]+)"')
+
+
+def file_contains(path: Path, needle: bytes) -> bool:
+    """Check for a byte string in a file without reading it into memory."""
+    with open(path, "rb") as f:
+        try:
+            with mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as mm:
+                return mm.find(needle) >= 0
+        except ValueError:  # empty file
+            return False
+
+
+def first_timestamp(session_file: Path) -> Optional[float]:
+    """Timestamp of the first entry that has one, from the head of the file."""
+    with open(session_file, "rb") as f:
+        match = _TIMESTAMP_PATTERN.search(f.read(_HEAD_BYTES))
+    return iso_to_epoch(match.group(1).decode()) if match else None
+
+
+def find_interaction_fast(
+    session_files: list[Path], commit_hash: str, commit_timestamp: float
+) -> tuple[Optional[Interaction], str]:
+    """Resolve a single commit, parsing only the session files that can match.
+
+    A file can only change the result of BlameResolver.resolve() if it holds the
+    commit's hash or a prompt at most MATCH_WINDOW_SECONDS before the commit.
+    Files unchanged since the cache was written are checked against their
+    cached interactions. Changed files are checked on raw bytes: the short hash
+    anywhere in the file (the author date can be later than when the hash was
+    printed, e.g. rebases or --date, so mtimes can't rule it out), or for the
+    window, a file modified since then that started before the commit.
+    """
+    if not session_files:
+        return None, "none"
+    repo_root = get_repo_root()
+    cached = load_cached_index(session_files[0].parent / CACHE_FILE_NAME, repo_root)
+    hashes = {commit_hash[:7], commit_hash}
+    short_hash = commit_hash[:7].encode()
+    selected: list[Path] = []
+    for session_file in session_files:
+        try:
+            st = session_file.stat()
+            hit = cached.get(str(session_file))
+            if hit and hit[0] == st.st_mtime_ns and hit[1] == st.st_size:
+                if any(
+                    0 <= commit_timestamp - interaction.timestamp <= MATCH_WINDOW_SECONDS
+                    or not hashes.isdisjoint(interaction.explicit_hashes)
+                    for interaction in hit[2]
+                ):
+                    selected.append(session_file)
+                continue
+
+            if file_contains(session_file, short_hash):
+                selected.append(session_file)
+                continue
+            if st.st_mtime < commit_timestamp - MATCH_WINDOW_SECONDS:
+                continue
+            started = first_timestamp(session_file)
+            if started is None or started <= commit_timestamp:
+                selected.append(session_file)
+        except (IOError, OSError):
+            continue
+
+    if not selected:
+        return None, "none"
+    return BlameResolver(build_index(selected, repo_root, cached)).resolve(commit_hash, commit_timestamp)
+
 
 app = typer.Typer(
     name="ai-blame",
     help="Show AI conversation context for git commits.",
     add_completion=False,
 )
-console = Console()
+console = Console(highlight=False)
+
 
+@lru_cache(maxsize=1)
+def git_executable() -> str:
+    """Absolute path to git; with close_fds=False this lets subprocess use posix_spawn."""
+    return shutil.which("git") or "git"
 
-def get_commit_session_id(commit: str) -> Optional[str]:
-    """Extract AI-Session-ID from commit message."""
+
+def _git(*args: str) -> bytes:
+    """Run a git command and return its raw stdout; callers decode only the fields they keep."""
+    result = subprocess.run(
+        [git_executable(), *args],
+        stdin=subprocess.DEVNULL, capture_output=True, check=True, close_fds=False,
+    )
+    return result.stdout
+
+
+@lru_cache(maxsize=1)
+def get_claude_dir() -> Path:
+    """Get the directory holding Claude Code's per-project session logs."""
+    return Path.home() / ".claude" / "projects"
+
+
+@lru_cache(maxsize=1)
+def get_repo_root() -> str:
+    """Get the repository's top-level directory (cwd outside a repository)."""
     try:
-        result = subprocess.run(
-            ["git", "log", "-1", "--format=%B", commit],
-            capture_output=True, text=True, check=True,
-        )
-        match = re.search(r"AI-Session-ID:\s*([a-f0-9-]+)", result.stdout)
-        return match.group(1) if match else None
+        return os.fsdecode(_git("rev-parse", "--show-toplevel").strip())
     except subprocess.CalledProcessError:
-        return None
+        return os.getcwd()
+
 
+_PROJECT_DIR_TRANS = str.maketrans({"/": "-", "_": "-"})
 
+
+@lru_cache(maxsize=1)
 def get_project_dir() -> str:
     """Get encoded project directory name."""
+    return get_repo_root().translate(_PROJECT_DIR_TRANS)
+
+
+# {"dirs": {project_dir: mtime_ns}, "sessions": {session_id: "project_dir/file.jsonl"}}
+SESSION_INDEX_FILE = ".session-index.json"
+
+
+def load_session_index(index_file: Path) -> dict:
+    """Load the session location index, or an empty one if missing or invalid."""
     try:
-        result = subprocess.run(
-            ["git", "rev-parse", "--show-toplevel"],
-            capture_output=True, text=True, check=True,
-        )
-        project_path = result.stdout.strip()
-    except subprocess.CalledProcessError:
-        project_path = os.getcwd()
-    return project_path.replace("/", "-").replace("_", "-")
+        with open(index_file, "rb") as f:
+            session_index = _loads(f.read())
+    except (OSError, ValueError):
+        session_index = None
+    if (
+        isinstance(session_index, dict)
+        and isinstance(session_index.get("dirs"), dict)
+        and isinstance(session_index.get("sessions"), dict)
+    ):
+        return session_index
+    return {"dirs": {}, "sessions": {}}
+
+
+def refresh_session_index(claude_dir: Path, session_index: dict) -> bool:
+    """Re-list the project directories whose mtime changed; return whether the index changed.
+
+    Adding or removing a session file bumps its directory's mtime, so unchanged
+    projects cost one stat each. Entries for deleted files are dropped on lookup.
+    """
+    dirs, sessions = session_index["dirs"], session_index["sessions"]
+    seen: dict[str, int] = {}
+    try:
+        with os.scandir(claude_dir) as it:
+            for project in it:
+                try:
+                    if not project.is_dir():
+                        continue
+                    mtime = project.stat().st_mtime_ns
+                    if dirs.get(project.name) != mtime:
+                        with os.scandir(project.path) as files:
+                            for f in files:
+                                if f.name.endswith(".jsonl"):
+                                    sessions[f.name[: -len(".jsonl")]] = f"{project.name}/{f.name}"
+                    seen[project.name] = mtime
+                except OSError:
+                    continue
+    except OSError:
+        return False
+    changed = seen != dirs
+    session_index["dirs"] = seen
+    return changed
+
+
+def save_session_index(index_file: Path, session_index: dict) -> None:
+    """Write the session location index atomically."""
+    tmp_file = index_file.with_name(f"{index_file.name}.{os.getpid()}.tmp")
+    try:
+        with open(tmp_file, "w") as f:
+            json.dump(session_index, f)
+        os.replace(tmp_file, index_file)
+    except OSError:
+        try:
+            tmp_file.unlink()
+        except OSError:
+            pass
 
 
 def find_session_file(session_id: str) -> Optional[Path]:
     """Find the session JSONL file."""
-    claude_dir = Path.home() / ".claude" / "projects"
+    claude_dir = get_claude_dir()
     project_dir = get_project_dir()
     session_file = claude_dir / project_dir / f"{session_id}.jsonl"
     if session_file.exists():
         return session_file
-    for proj_dir in claude_dir.iterdir():
-        if proj_dir.is_dir():
-            candidate = proj_dir / f"{session_id}.jsonl"
-            if candidate.exists():
-                return candidate
-    return None
 
+    # Session from another project: look it up in the index of all projects
+    index_file = claude_dir / SESSION_INDEX_FILE
+    session_index = load_session_index(index_file)
+    sessions = session_index["sessions"]
+    cached = sessions.get(session_id)
+    if cached:
+        session_file = claude_dir / cached
+        if session_file.exists():
+            return session_file
+        del sessions[session_id]
+
+    changed = refresh_session_index(claude_dir, session_index)
+    if changed or cached:
+        save_session_index(index_file, session_index)
+    cached = sessions.get(session_id)
+    return claude_dir / cached if cached else None
+
+
+# `git log` sentinels: records start with \x02, fields are separated by \x01
+_COMMIT_FORMAT = "%x02%H%x01%P%x01%s%x01%an%x01%aI%x01%B%x01"
+SESSION_ID_PATTERN = re.compile(rb"AI-Session-ID:\s*([a-f0-9-]+)")
+
+
+def parse_numstat(output: bytes) -> dict:
+    """Parse `--numstat` lines into {path: {"added": n, "deleted": n}}."""
+    stats = {}
+    for line in output.split(b"\n"):
+        parts = line.split(b"\t", 2)
+        if len(parts) == 3:
+            added = int(parts[0]) if parts[0] != b"-" else 0
+            deleted = int(parts[1]) if parts[1] != b"-" else 0
+            stats[parts[2].decode(errors="replace")] = {"added": added, "deleted": deleted}
+    return stats
+
+
+def parse_commit_log(output: bytes) -> dict[str, dict]:
+    """Parse `git log --numstat --format=_COMMIT_FORMAT` output into {full_hash: info}."""
+    results = {}
+    for record in output.split(b"\x02")[1:]:
+        fields = record.split(b"\x01")
+        if len(fields) < 7:
+            continue
+        commit_hash, parents, subject, author, date, body, numstat = fields[:7]
+        commit_hash = commit_hash.decode()
+        match = SESSION_ID_PATTERN.search(body)
+        results[commit_hash] = {
+            "hash": commit_hash,
+            "parents": parents.decode().split(),
+            "subject": subject.decode(errors="replace"),
+            "author": author.decode(errors="replace"),
+            "date": date.decode(),
+            "session_id": match.group(1).decode() if match else None,
+            "stats": parse_numstat(numstat),
+        }
+    return results
+
+
+def get_commits_bulk(commits: list[str]) -> dict[str, dict]:
+    """Get metadata, AI-Session-ID and file stats for many commits in one git call.
 
-def get_commit_info(commit: str) -> dict:
-    """Get commit metadata."""
+    Returns {full_hash: info} in the order the commits were given.
+    """
+    if not commits:
+        return {}
     try:
-        result = subprocess.run(
-            ["git", "log", "-1", "--format=%H%n%s%n%an%n%aI", commit],
-            capture_output=True, text=True, check=True,
+        output = _git(
+            "log", "--no-walk=unsorted", "--numstat", "--diff-merges=first-parent",
+            f"--format={_COMMIT_FORMAT}", "--end-of-options", *commits, "--",
         )
-        lines = result.stdout.strip().split("\n")
-        return {"hash": lines[0], "subject": lines[1], "author": lines[2], "date": lines[3]}
     except subprocess.CalledProcessError:
         return {}
+    return parse_commit_log(output)
 
 
-def get_commit_timestamp(commit: str) -> Optional[datetime]:
-    """Get commit timestamp as datetime."""
-    try:
-        result = subprocess.run(
-            ["git", "log", "-1", "--format=%aI", commit],
-            capture_output=True, text=True, check=True,
-        )
-        return datetime.fromisoformat(result.stdout.strip())
-    except (subprocess.CalledProcessError, ValueError):
-        return None
+class CommitRangeLog:
+    """get_commits_bulk() for every commit in a range, run as a background git process.
 
+    git walks the range itself, so no list of hashes is passed on the command line.
+    It writes to a temporary file rather than a pipe, so it runs to completion
+    while the caller does other work; result() waits for it and parses the log.
+    """
 
-def get_previous_commit(commit: str) -> Optional[str]:
-    """Get the previous commit hash, or None if first commit."""
-    try:
-        result = subprocess.run(
-            ["git", "rev-parse", f"{commit}^"],
-            capture_output=True, text=True, check=True,
+    def __init__(self, commit_range: str):
+        self.output = tempfile.TemporaryFile()
+        self.process = subprocess.Popen(
+            [
+                git_executable(), "log", "--numstat", "--diff-merges=first-parent",
+                f"--format={_COMMIT_FORMAT}", "--end-of-options", commit_range, "--",
+            ],
+            stdin=subprocess.DEVNULL, stdout=self.output, stderr=subprocess.DEVNULL, close_fds=False,
         )
-        return result.stdout.strip()
-    except subprocess.CalledProcessError:
-        return None
 
+    def result(self) -> Optional[dict[str, dict]]:
+        """{full_hash: info}, newest first, or None if git failed (e.g. an invalid range)."""
+        with self.output:
+            if self.process.wait() != 0:
+                return None
+            self.output.seek(0)
+            return parse_commit_log(self.output.read())
 
-def parse_timestamp(ts: str) -> Optional[datetime]:
-    """Parse ISO timestamp string to datetime."""
-    try:
-        return datetime.fromisoformat(ts.replace("Z", "+00:00"))
-    except (ValueError, AttributeError):
-        return None
 
+def load_commit(commit: str) -> dict:
+    """Get everything blame needs about one commit in one git call ({} if not found)."""
+    return next(iter(get_commits_bulk([commit]).values()), {})
 
-def get_commit_stats(commit: str) -> dict:
-    """Get file change statistics."""
-    try:
-        result = subprocess.run(
-            ["git", "diff", "--numstat", f"{commit}^..{commit}"],
-            capture_output=True, text=True, check=True,
+
+class GitBatch:
+    """A long-running `git cat-file --batch` process for commit metadata lookups.
+
+    Each lookup is a line written to its stdin instead of a new git process,
+    which pays off when many commits are resolved in one run. File stats are
+    not available this way; use get_commits_bulk() for those.
+    """
+
+    def __init__(self):
+        self.process: Optional[subprocess.Popen] = None
+
+    def __enter__(self) -> "GitBatch":
+        self.process = subprocess.Popen(
+            [git_executable(), "cat-file", "--batch"],
+            stdin=subprocess.PIPE, stdout=subprocess.PIPE, stderr=subprocess.DEVNULL, close_fds=False,
         )
-        stats = {}
-        for line in result.stdout.strip().split("\n"):
-            if line:
-                parts = line.split("\t")
-                if len(parts) >= 3:
-                    added = int(parts[0]) if parts[0] != "-" else 0
-                    deleted = int(parts[1]) if parts[1] != "-" else 0
-                    stats[parts[2]] = {"added": added, "deleted": deleted}
-        return stats
-    except subprocess.CalledProcessError:
-        return {}
+        return self
 
+    def __exit__(self, *exc_info) -> None:
+        try:
+            self.process.stdin.close()
+        except OSError:
+            pass
+        self.process.wait()
+        self.process.stdout.close()
+
+    def read_object(self, rev: str) -> Optional[tuple[str, str, bytes]]:
+        """Return (sha, type, content) for a revision, or None if it doesn't resolve."""
+        try:
+            self.process.stdin.write(rev.encode() + b"\n")
+            self.process.stdin.flush()
+            header = self.process.stdout.readline().split()
+            if len(header) != 3:  # "<rev> missing" / "<rev> ambiguous"
+                return None
+            sha, obj_type, size = header
+            content = self.process.stdout.read(int(size))
+            self.process.stdout.read(1)  # newline after the content
+        except (OSError, ValueError):
+            return None
+        return sha.decode(), obj_type.decode(), content
 
-def extract_user_content(message: dict) -> Optional[str]:
-    """Extract readable content from user message."""
-    content = message.get("content", "")
-    if isinstance(content, str):
-        if content.startswith("<command-message>"):
+    def commit(self, rev: str) -> Optional[dict]:
+        """Commit metadata in the shape of get_commits_bulk(), without "stats"."""
+        obj = self.read_object(f"{rev}^{{commit}}")
+        if obj is None:
             return None
-        return content.strip() if content.strip() else None
-    if isinstance(content, list):
-        texts = []
-        for item in content:
-            if isinstance(item, dict) and item.get("type") == "text":
-                text = item.get("text", "")
-                if not text.startswith("#"):
-                    texts.append(text)
-        return "\n".join(texts).strip() if texts else None
-    return None
+        sha, _, content = obj
+        headers, _, message = content.partition(b"\n\n")
+
+        parents: list[str] = []
+        author = date = ""
+        for line in headers.split(b"\n"):
+            key, _, value = line.partition(b" ")
+            if key == b"parent":
+                parents.append(value.decode())
+            elif key == b"author":
+                # "Name <email> 1700000000 +0100"
+                ident, epoch, tz = value.rsplit(b" ", 2)
+                author = ident.rsplit(b" <", 1)[0].decode(errors="replace")
+                offset = timedelta(hours=int(tz[1:3]), minutes=int(tz[3:5]))
+                date = datetime.fromtimestamp(
+                    int(epoch), timezone(-offset if tz[:1] == b"-" else offset)
+                ).isoformat()
+
+        subject = b" ".join(message.split(b"\n\n", 1)[0].split(b"\n")).rstrip()
+        match = SESSION_ID_PATTERN.search(message)
+        return {
+            "hash": sha,
+            "parents": parents,
+            "subject": subject.decode(errors="replace"),
+            "author": author,
+            "date": date,
+            "session_id": match.group(1).decode() if match else None,
+        }
 
 
-def extract_assistant_content(message: dict) -> list:
-    """Extract content from assistant message."""
-    content = message.get("content", [])
-    results = []
-    if isinstance(content, list):
-        for item in content:
-            if isinstance(item, dict):
-                if item.get("type") == "text":
-                    results.append({"type": "text", "content": item.get("text", "")})
-                elif item.get("type") == "tool_use":
-                    results.append({
-                        "type": "tool",
-                        "name": item.get("name", ""),
-                        "input": item.get("input", {}),
-                    })
-    return results
+def parse_timestamp(ts: str) -> Optional[datetime]:
+    """Parse ISO timestamp string to datetime."""
+    try:
+        if ts.endswith("Z"):  # fromisoformat() only accepts "Z" from Python 3.11
+            ts = ts[:-1] + "+00:00"
+        return datetime.fromisoformat(ts)
+    except (ValueError, AttributeError):
+        return None
 
 
-def parse_session(session_file: Path, include_responses: bool = False) -> list:
-    """Parse session file and extract conversation."""
+def iter_assistant_items(message: dict) -> Iterator[tuple[str, str]]:
+    """Yield ("text", text) and ("edit", file_path) items from an assistant message."""
+    content = message.get("content", [])
+    if not isinstance(content, list):
+        return
+    for item in content:
+        if not isinstance(item, dict):
+            continue
+        item_type = item.get("type")
+        if item_type == "text":
+            yield "text", item.get("text", "")
+        elif item_type == "tool_use" and item.get("name") in _TOOL_EDIT_NAMES:
+            file_path = item.get("input", {}).get("file_path", "")
+            if file_path:
+                yield "edit", file_path
+
+
+def parse_session(
+    session_file: Path,
+    include_responses: bool = False,
+    t_lo: Optional[float] = None,
+    t_hi: Optional[float] = None,
+) -> list:
+    """Parse session file and extract conversation.
+
+    With bounds, only entries in (t_lo, t_hi] (Unix epoch) are kept; entries are
+    appended in time order, so reading stops at the first one after t_hi.
+    """
+    bounded = t_lo is not None or t_hi is not None
+    # Timestamps in the exact log format ("YYYY-MM-DDTHH:MM:SS.fffZ") are compared
+    # as strings against the bounds in that format; anything else is parsed
+    lo_str = epoch_to_log_timestamp(t_lo) if t_lo is not None else None
+    hi_str = epoch_to_log_timestamp(t_hi) if t_hi is not None else None
     messages = []
-    with open(session_file, "r") as f:
-        for line in f:
-            try:
-                entry = json.loads(line)
-            except json.JSONDecodeError:
-                continue
+    prompt: Optional[dict] = None  # edits are attributed to the latest prompt
+    root_prefix = os.path.join(get_repo_root(), "")
+    for line in iter_marked_lines(session_file, (_USER_MARKER, _ASSISTANT_MARKER)):
+        try:
+            entry = _loads(line)
+        except ValueError:
+            continue
 
-            entry_type = entry.get("type")
-            is_meta = entry.get("isMeta", False)
-            user_type = entry.get("userType")
-            timestamp = entry.get("timestamp", "")
-
-            if entry_type == "user" and user_type == "external" and not is_meta:
-                msg = entry.get("message", {})
-                content = extract_user_content(msg)
-                if content:
-                    messages.append({
-                        "type": "prompt",
-                        "content": content,
-                        "timestamp": timestamp,
-                        "files_changed": [],
-                    })
-
-            elif entry_type == "assistant":
-                msg = entry.get("message", {})
-                assistant_content = extract_assistant_content(msg)
-                for item in assistant_content:
-                    if item["type"] == "tool" and item["name"] in ("Edit", "Write"):
-                        file_path = item["input"].get("file_path", "")
-                        if file_path and messages and messages[-1]["type"] == "prompt":
-                            try:
-                                rel_path = os.path.relpath(file_path)
-                            except ValueError:
-                                rel_path = file_path
-                            if rel_path not in messages[-1]["files_changed"]:
-                                messages[-1]["files_changed"].append(rel_path)
-
-                if include_responses:
-                    texts = [i["content"] for i in assistant_content if i["type"] == "text" and i["content"].strip()]
-                    if texts:
-                        messages.append({"type": "response", "content": "\n".join(texts), "timestamp": timestamp})
+        timestamp = entry.get("timestamp", "")
+        if bounded:
+            if (
+                isinstance(timestamp, str)
+                and len(timestamp) == 24
+                and timestamp[10] == "T"
+                and timestamp[19] == "."
+                and timestamp[-1] == "Z"
+            ):
+                if hi_str is not None and timestamp > hi_str:
+                    break
+                if lo_str is not None and timestamp <= lo_str:
+                    continue
+            elif (entry_time := iso_to_epoch(timestamp)) is not None:
+                if t_hi is not None and entry_time > t_hi:
+                    break
+                if t_lo is not None and entry_time <= t_lo:
+                    continue
+
+        entry_type = entry.get("type")
+        is_meta = entry.get("isMeta", False)
+        user_type = entry.get("userType")
+
+        if entry_type == "user" and user_type == "external" and not is_meta:
+            msg = entry.get("message", {})
+            content = extract_user_text(msg, CONVERSATION_SKIP_MARKERS)
+            if content:
+                prompt = {
+                    "type": "prompt",
+                    "content": content,
+                    "timestamp": timestamp,
+                    "files_changed": set(),
+                }
+                messages.append(prompt)
+
+        elif entry_type == "assistant" and (prompt is not None or include_responses):
+            texts = []
+            for kind, payload in iter_assistant_items(entry.get("message", {})):
+                if kind == "edit":
+                    if prompt is not None:
+                        prompt["files_changed"].add(strip_root(payload, root_prefix))
+                elif include_responses and payload.strip():
+                    texts.append(payload)
+            if texts:
+                messages.append({"type": "response", "content": "\n".join(texts), "timestamp": timestamp})
     return messages
 
 
 def format_time(ts: str) -> str:
     """Format timestamp to HH:MM."""
-    try:
-        dt = datetime.fromisoformat(ts.replace("Z", "+00:00"))
+    dt = parse_timestamp(ts)
+    if dt:
         return dt.strftime("%H:%M")
-    except (ValueError, AttributeError):
-        return ts[:5] if ts else ""
+    return ts[:5] if ts else ""
 
 
 def format_diff(added: int, deleted: int) -> Text:
@@ -461,48 +1042,35 @@ def format_timestamp_from_epoch(ts: float) -> str:
         return ""
 
 
-@app.command()
-def blame(
-    commit: str = typer.Argument("HEAD", help="Commit hash or reference"),
-    responses: bool = typer.Option(False, "--responses", "-r", help="Include AI responses"),
-    all_prompts: bool = typer.Option(False, "--all", "-a", help="Show all prompts from session, not just time-windowed"),
-    project_dir: Optional[str] = typer.Option(None, "--project", "-p", help="Override project directory (encoded path)"),
-):
-    """Show AI conversation context for a git commit."""
-    commit_info = get_commit_info(commit)
-    if not commit_info:
-        console.print(f"[red]Error:[/red] Commit not found: {commit}")
-        raise typer.Exit(1)
-
-    commit_stats = get_commit_stats(commit)
-    commit_time = get_commit_timestamp(commit)
+def show_commit_context(
+    commit_info: dict,
+    interaction: Optional[Interaction],
+    match_method: str,
+    responses: bool = False,
+    all_prompts: bool = False,
+    git: Optional[GitBatch] = None,
+) -> bool:
+    """Print a commit's header, files and prompts; False if it has no AI context.
+
+    Without a matched interaction, prompts come from the session named in the
+    commit message. An open GitBatch can be passed to look up parent commits.
+    """
+    commit_stats = commit_info["stats"]
+    commit_time = parse_timestamp(commit_info["date"])
     commit_timestamp = commit_time.timestamp() if commit_time else 0.0
 
-    # Try strategy-based resolution first (works without AI-Session-ID)
-    session_files = find_all_session_files(project_dir)
-    interaction: Optional[Interaction] = None
-    match_method = "none"
-
-    if session_files:
-        index = build_index(session_files)
-        resolver = BlameResolver(index)
-        interaction, match_method = resolver.resolve(commit_info["hash"], commit_timestamp)
-
     # Fallback: Try session ID from commit message (old approach)
-    session_id = get_commit_session_id(commit)
+    session_id = commit_info["session_id"]
     session_file: Optional[Path] = None
-    messages: list = []
 
     if session_id:
         session_file = find_session_file(session_id)
-        if session_file:
-            messages = parse_session(session_file, responses)
 
     # If no interaction found and no session file, show error
     if not interaction and not session_file:
         console.print(f"[yellow]No AI context found for commit {commit_info['hash'][:8]}[/yellow]")
         console.print(Text("No session files available or commit not in session logs.", style="dim"))
-        raise typer.Exit(1)
+        return False
 
     # Header: compact single line
     header = Text()
@@ -524,17 +1092,23 @@ def blame(
 
     # Files table: compact, no borders
     if commit_stats:
-        file_table = Table(box=None, padding=(0, 1), show_header=False, pad_edge=False)
-        file_table.add_column("File", style="white")
-        file_table.add_column("Diff", justify="right")
-
-        total_add, total_del = 0, 0
-        for fname, stats in sorted(commit_stats.items()):
-            file_table.add_row(fname, format_diff(stats["added"], stats["deleted"]))
-            total_add += stats["added"]
-            total_del += stats["deleted"]
-
-        console.print(file_table)
+        total_add = sum(stats["added"] for stats in commit_stats.values())
+        total_del = sum(stats["deleted"] for stats in commit_stats.values())
+
+        if console.is_terminal:
+            from rich.table import Table
+
+            file_table = Table(box=None, padding=(0, 1), show_header=False, pad_edge=False)
+            file_table.add_column("File", style="white")
+            file_table.add_column("Diff", justify="right")
+            for fname, stats in sorted(commit_stats.items()):
+                file_table.add_row(fname, format_diff(stats["added"], stats["deleted"]))
+            console.print(file_table)
+        else:
+            # Piped: tab-separated rows, no table layout (and easy to cut/grep)
+            print("\n".join(
+                f"{fname}\t+{stats['added']} -{stats['deleted']}" for fname, stats in sorted(commit_stats.items())
+            ))
 
         total = Text()
         total.append("Total: ", style="dim")
@@ -547,6 +1121,8 @@ def blame(
     console.print()
 
     prompt_num = 0
+    # (added, deleted) per file, for the per-prompt file lines
+    stat_lookup = {fname: (stats["added"], stats["deleted"]) for fname, stats in commit_stats.items()}
 
     # If we have a direct interaction match, show it
     if interaction:
@@ -563,42 +1139,34 @@ def blame(
         console.print(Text(interaction.prompt, style="white"))
 
         # Files edited (only those in this commit)
-        if interaction.files_edited:
-            for f in interaction.files_edited:
-                try:
-                    rel_path = os.path.relpath(f)
-                except ValueError:
-                    rel_path = f
-                if rel_path in commit_stats:
-                    file_line = Text()
-                    file_line.append("→ ", style="dim")
-                    file_line.append(rel_path, style="bold yellow")
-                    s = commit_stats[rel_path]
-                    file_line.append(f" +{s['added']}", style="bold green")
-                    file_line.append(f" -{s['deleted']}", style="bold red")
-                    console.print(file_line)
+        for rel_path in sorted(interaction.files_edited.intersection(stat_lookup)):
+            added, deleted = stat_lookup[rel_path]
+            file_line = Text()
+            file_line.append("→ ", style="dim")
+            file_line.append(rel_path, style="bold yellow")
+            file_line.append(f" +{added}", style="bold green")
+            file_line.append(f" -{deleted}", style="bold red")
+            console.print(file_line)
 
         console.print()
         source = f"1 prompt • {interaction.session_id}"
 
     # Otherwise, use session-based parsing (old approach)
-    elif messages:
-        prev_commit = get_previous_commit(commit)
-        prev_time = get_commit_timestamp(prev_commit) if prev_commit else None
-
+    elif session_file:
+        # Time-based filtering: only entries between previous commit and this commit
+        t_lo = t_hi = None
+        if not all_prompts and commit_time:
+            t_hi = commit_timestamp
+            prev_commit = commit_info["parents"][0] if commit_info["parents"] else None
+            if prev_commit:
+                with nullcontext(git) if git else GitBatch() as batch:
+                    prev_info = batch.commit(prev_commit)
+                prev_time = parse_timestamp(prev_info["date"]) if prev_info else None
+                t_lo = prev_time.timestamp() if prev_time else None
+
+        messages = parse_session(session_file, responses, t_lo, t_hi)
         for msg in messages:
             if msg["type"] == "prompt":
-                # Time-based filtering: show prompts between previous commit and this commit
-                if not all_prompts and commit_time:
-                    msg_time = parse_timestamp(msg["timestamp"])
-                    if msg_time:
-                        # Skip if after this commit
-                        if msg_time > commit_time:
-                            continue
-                        # Skip if before or at previous commit time
-                        if prev_time and msg_time <= prev_time:
-                            continue
-
                 prompt_num += 1
                 time_str = format_time(msg["timestamp"])
 
@@ -612,16 +1180,14 @@ def blame(
                 console.print(Text(msg["content"], style="white"))
 
                 # Files changed (only those in this commit, for reference)
-                files = [f for f in msg.get("files_changed", []) if f in commit_stats]
-                if files:
-                    for f in files:
-                        file_line = Text()
-                        file_line.append("→ ", style="dim")
-                        file_line.append(f, style="bold yellow")
-                        s = commit_stats[f]
-                        file_line.append(f" +{s['added']}", style="bold green")
-                        file_line.append(f" -{s['deleted']}", style="bold red")
-                        console.print(file_line)
+                for f in sorted(msg["files_changed"].intersection(stat_lookup)):
+                    added, deleted = stat_lookup[f]
+                    file_line = Text()
+                    file_line.append("→ ", style="dim")
+                    file_line.append(f, style="bold yellow")
+                    file_line.append(f" +{added}", style="bold green")
+                    file_line.append(f" -{deleted}", style="bold red")
+                    console.print(file_line)
 
                 console.print()
 
@@ -636,42 +1202,151 @@ def blame(
         source = "No prompts found"
 
     console.print(Text(source, style="dim"))
+    return True
+
+
+@app.command()
+def blame(
+    commit: Optional[str] = typer.Argument(None, help="Commit hash or reference [default: HEAD]"),
+    responses: bool = typer.Option(False, "--responses", "-r", help="Include AI responses"),
+    all_prompts: bool = typer.Option(False, "--all", "-a", help="Show all prompts from session, not just time-windowed"),
+    project_dir: Optional[str] = typer.Option(None, "--project", "-p", help="Override project directory (encoded path)"),
+    commit_range: Optional[str] = typer.Option(None, "--range", help="Show every commit in a range (A..B) instead"),
+):
+    """Show AI conversation context for a git commit."""
+    if commit_range:
+        if commit:
+            console.print("[red]Error:[/red] Give either a commit or --range, not both")
+            raise typer.Exit(1)
+        blame_range(commit_range, responses, all_prompts, project_dir)
+        return
+    if commit is None:
+        commit = "HEAD"
+
+    # git runs in its own process, so look it up while the session files are listed
+    with ThreadPoolExecutor(max_workers=1) as executor:
+        commit_future = executor.submit(load_commit, commit)
+        session_files = find_all_session_files(project_dir)
+        commit_info = commit_future.result()
+
+    if not commit_info:
+        console.print(f"[red]Error:[/red] Commit not found: {commit}")
+        raise typer.Exit(1)
+
+    commit_time = parse_timestamp(commit_info["date"])
+    commit_timestamp = commit_time.timestamp() if commit_time else 0.0
+
+    # Try strategy-based resolution first (works without AI-Session-ID)
+    interaction: Optional[Interaction] = None
+    match_method = "none"
+
+    if session_files:
+        interaction, match_method = find_interaction_fast(session_files, commit_info["hash"], commit_timestamp)
+
+    if not show_commit_context(commit_info, interaction, match_method, responses, all_prompts):
+        raise typer.Exit(1)
+
+
+def blame_range(
+    commit_range: str, responses: bool, all_prompts: bool, project_dir: Optional[str]
+) -> None:
+    """Show AI context for every commit in a range, newest first."""
+    # A single revision would walk its whole history
+    if ".." not in commit_range:
+        console.print(f"[red]Error:[/red] --range needs the form A..B, got: {commit_range}")
+        raise typer.Exit(1)
+
+    # One git process for all commit metadata and stats runs while the session
+    # index is built; no thread, since build_index may fork a process pool
+    range_log = CommitRangeLog(commit_range)
+    session_files = find_all_session_files(project_dir)
+    index = build_index(session_files) if session_files else None
+    infos = range_log.result()
+
+    if infos is None:
+        console.print(f"[red]Error:[/red] Invalid commit range: {commit_range}")
+        raise typer.Exit(1)
+    if not infos:
+        console.print(f"[yellow]No commits in range {commit_range}[/yellow]")
+        raise typer.Exit(0)
+
+    commit_infos = list(infos.values())
+    commits = []
+    for info in commit_infos:
+        commit_time = parse_timestamp(info["date"])
+        commits.append((info["hash"], commit_time.timestamp() if commit_time else 0.0))
+    if index:
+        matches = BlameResolver(index).resolve_many(commits)
+    else:
+        matches = [(None, "none")] * len(commits)
+
+    with GitBatch() as git:
+        for i, (info, (interaction, match_method)) in enumerate(zip(commit_infos, matches)):
+            if i:
+                console.print(Text("─" * 40, style="dim"))
+                console.print()
+            show_commit_context(info, interaction, match_method, responses, all_prompts, git)
+
+
+_MODEL_MARKER = b'"model":'
+MODEL_TAIL_BYTES = 64 * 1024
+
+
+def _model_from_line(line: bytes) -> Optional[str]:
+    if _MODEL_MARKER not in line:
+        return None
+    try:
+        msg = _loads(line).get("message")
+    except ValueError:  # includes a line cut off at the tail boundary
+        return None
+    if isinstance(msg, dict):
+        return msg.get("model")
+    return None
+
+
+def find_session_model(session_file: Path) -> Optional[str]:
+    """Return the model recorded in a session, reading the end of the file first."""
+    with open(session_file, "rb") as f:
+        size = f.seek(0, os.SEEK_END)
+        start = max(0, size - MODEL_TAIL_BYTES)
+        f.seek(start)
+        for line in reversed(f.read().split(b"\n")):
+            model = _model_from_line(line)
+            if model:
+                return model
+        if not start:
+            return None
+        # No assistant message near the end (e.g. one huge tool result): scan forward
+        f.seek(0)
+        for line in f:
+            model = _model_from_line(line)
+            if model:
+                return model
+    return None
 
 
 @app.command()
 def session_info():
     """Output current session ID and Claude version for commits."""
-    claude_dir = Path.home() / ".claude" / "projects"
+    claude_dir = get_claude_dir()
     project_path = claude_dir / get_project_dir()
 
     session_id = None
-    session_file = None
     model = "unknown"
 
-    if project_path.exists():
-        sessions = [(f.stat().st_mtime, f) for f in project_path.glob("*.jsonl") if not f.stem.startswith("agent-")]
-        if sessions:
-            sessions.sort(reverse=True)
-            session_file = sessions[0][1]
-            session_id = session_file.stem
-
-            # Get model from session file
-            with open(session_file, "r") as f:
-                for line in f:
-                    if '"model":' in line:
-                        try:
-                            entry = json.loads(line)
-                            msg = entry.get("message", {})
-                            if "model" in msg:
-                                model = msg["model"]
-                                break
-                        except json.JSONDecodeError:
-                            continue
+    sessions = scan_session_entries(project_path)
+    if sessions:
+        session_file = Path(sessions[-1].path)
+        session_id = session_file.stem
+        model = find_session_model(session_file) or model
 
     # Get version
     try:
-        result = subprocess.run(["claude", "--version"], capture_output=True, text=True, check=True)
-        version = result.stdout.strip().split()[0]
+        result = subprocess.run(
+            ["claude", "--version"],
+            stdin=subprocess.DEVNULL, capture_output=True, check=True, close_fds=False,
+        )
+        version = result.stdout.split()[0].decode()
     except (subprocess.CalledProcessError, IndexError):
         version = "unknown"
 
@@ -687,24 +1362,27 @@ def list_sessions(
     limit: int = typer.Option(10, "--limit", "-n", help="Max sessions to show"),
 ):
     """List recent AI sessions for current project."""
-    claude_dir = Path.home() / ".claude" / "projects"
+    claude_dir = get_claude_dir()
     project_path = claude_dir / get_project_dir()
 
-    if not project_path.exists():
+    sessions = scan_session_entries(project_path)
+    if not sessions:
         console.print("[yellow]No sessions found.[/yellow]")
         raise typer.Exit(0)
+    sessions.reverse()
 
-    sessions = [(f.stat().st_mtime, f) for f in project_path.glob("*.jsonl") if not f.stem.startswith("agent-")]
-    sessions.sort(reverse=True)
+    from rich import box
+    from rich.table import Table
 
     table = Table(box=box.SIMPLE, padding=(0, 1))
     table.add_column("Session", style="cyan")
     table.add_column("Modified", style="dim")
     table.add_column("Size", justify="right")
 
-    for mtime, f in sessions[:limit]:
-        dt = datetime.fromtimestamp(mtime)
-        table.add_row(f.stem, dt.strftime("%Y-%m-%d %H:%M"), f"{f.stat().st_size/1024:.0f}KB")
+    for entry in sessions[:limit]:
+        st = entry.stat()
+        dt = datetime.fromtimestamp(st.st_mtime)
+        table.add_row(entry.name[: -len(".jsonl")], dt.strftime("%Y-%m-%d %H:%M"), f"{st.st_size/1024:.0f}KB")
 
     console.print(table)
 
@@ -717,15 +1395,12 @@ def coverage(
     """Show AI attribution coverage for commits in the repo."""
     # Get all commits
     try:
-        result = subprocess.run(
-            ["git", "log", "--format=%H %aI"],
-            capture_output=True, text=True, check=True,
-        )
+        log_output = _git("log", "--format=%H %aI")
     except subprocess.CalledProcessError:
         console.print("[red]Error:[/red] Not a git repository")
         raise typer.Exit(1)
 
-    commits_raw = result.stdout.strip().split("\n")
+    commits_raw = log_output.decode().strip().split("\n")
     if limit > 0:
         commits_raw = commits_raw[:limit]
 
@@ -742,6 +1417,7 @@ def coverage(
     stats = {"hash": 0, "time": 0, "none": 0}
     results: list[tuple[str, str, str]] = []
 
+    commits: list[tuple[str, float]] = []
     for line in commits_raw:
         if not line.strip():
             continue
@@ -749,14 +1425,10 @@ def coverage(
         commit_hash = parts[0]
         commit_date = parts[1] if len(parts) > 1 else ""
 
-        try:
-            ts = datetime.fromisoformat(commit_date)
-            commit_timestamp = ts.timestamp()
-        except (ValueError, AttributeError):
-            commit_timestamp = 0.0
-
-        interaction, method = resolver.resolve(commit_hash, commit_timestamp)
+        commit_time = parse_timestamp(commit_date)
+        commits.append((commit_hash, commit_time.timestamp() if commit_time else 0.0))
 
+    for (commit_hash, _), (interaction, method) in zip(commits, resolver.resolve_many(commits)):
         if method == "match_by_hash":
             stats["hash"] += 1
             results.append((commit_hash[:8], "HASH", "bold green"))
@@ -771,6 +1443,9 @@ def coverage(
     total = len(results)
     console.print()
 
+    from rich import box
+    from rich.table import Table
+
     table = Table(title=f"Coverage Summary ({total} commits)", box=box.ROUNDED)
     table.add_column("Match Type", style="white")
     table.add_column("Count", justify="right")
@@ -792,4 +1467,6 @@ def coverage(
 
 
 if __name__ == "__main__":
+    # Frozen builds (make ai-blame-bin): pool workers re-run this executable
+    multiprocessing.freeze_support()
     app()